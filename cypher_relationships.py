@@ -1,4 +1,14 @@
 import re
+from collections import namedtuple
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Schema lookups live in their own module so they can optionally be compiled with Cython (see setup.py).
+from cypher_relationships_core import (
+    find_single_label_relationship_in_schema,
+    is_unfixable,
+    make_left_to_right,
+)
 
 
 PATTERN_CONFIG = {
@@ -34,6 +44,57 @@ PATTERN_CONFIG = {
 }
 
 
+# Named groups in PATTERN_CONFIG that are never read after matching.
+UNUSED_GROUPS = (
+    "node1",
+    "node1_props",
+    "rel_var_name",
+    "rel_props",
+    "node2",
+    "node2_props",
+)
+
+
+@lru_cache(maxsize=None)
+def compile_patterns(node1_pattern, arrow_pattern, node2_pattern, flags=re.VERBOSE):
+    # Compile the node pattern and the combined arrow and right-hand node pattern once per unique set of pattern strings.
+    return re.compile(node1_pattern, flags), re.compile(
+        arrow_pattern + node2_pattern, flags
+    )
+
+
+def compact_pattern(pattern, unused_groups=UNUSED_GROUPS):
+    # Strip whitespace and comments from a VERBOSE pattern and turn unused named groups into non-capturing groups.
+    pattern = re.sub(r"\s+|#.*", "", pattern)
+    for group_name in unused_groups:
+        pattern = pattern.replace("(?P<" + group_name + ">", "(?:")
+    return pattern
+
+
+def get_compiled_patterns(pattern_config):
+    # Return compiled patterns for the default config without any lookup, otherwise compile (or reuse) the custom config.
+    if pattern_config is PATTERN_CONFIG:
+        return _NODE_RE, _ARROW_NODE_RE
+    return compile_patterns(
+        pattern_config["node1_pattern"],
+        pattern_config["arrow_pattern"],
+        pattern_config["node2_pattern"],
+    )
+
+
+# The default patterns are compacted once so the runtime regex has no VERBOSE preprocessing and fewer captures.
+_NODE_RE, _ARROW_NODE_RE = compile_patterns(
+    compact_pattern(PATTERN_CONFIG["node1_pattern"]),
+    compact_pattern(PATTERN_CONFIG["arrow_pattern"]),
+    compact_pattern(PATTERN_CONFIG["node2_pattern"]),
+    flags=0,
+)
+
+
+# Translation table that deletes whitespace, backticks and colons from relationship labels.
+_LABEL_STRIP = str.maketrans("", "", " \t\n\r\f\v`:")
+
+
 def fix_cypher_relationship_directions(
     cypher_text, schema_text, pattern_config=PATTERN_CONFIG
 ):
@@ -61,339 +122,379 @@ def fix_cypher_relationship_directions(
         >>> fix_cypher_relationship_directions(cypher_text, schema_text)
         'MATCH (p:Person) RETURN p, [(p)-[:WORKS_AT]->(o:Organization) | o.name] AS op'
     """
-    # Process schema to be list of tuples.
-    schema_lst = process_schema(schema_text)
+    # The result only depends on the two strings when the default patterns are used, so it can be cached.
+    if pattern_config is PATTERN_CONFIG:
+        return _fix_cached(cypher_text, schema_text)
+    return _fix(cypher_text, schema_text, pattern_config)
 
-    # Use regular expressions (re library) to detect relationship patterns and return as list of dicts.
-    relationships = detect_relationships(cypher_text, schema_lst, pattern_config)
 
-    for rel in relationships:
-        # Check if relationship exists within the defined schema.
-        find_relationship_in_schema(rel, schema_lst)
+@lru_cache(maxsize=2048)
+def _fix_cached(cypher_text, schema_text):
+    return _fix(cypher_text, schema_text, PATTERN_CONFIG)
 
-        # Check for schema mismatches and return empty string if present.
-        if "schema_match" in rel and rel["schema_match"] == False:
-            cypher_text = ""
-            break
 
-        # Correct incorrect directions.
-        if "is_correct" in rel and not rel["is_correct"]:
-            cypher_text = switch_direction(cypher_text, rel)
+def _fix(cypher_text, schema_text, pattern_config):
+    # Process schema into sets of triples with precomputed column projections.
+    schema = process_schema(schema_text)
 
-    return cypher_text
+    return fix_directions_with_schema(cypher_text, schema, pattern_config, {})
 
 
-def process_schema(schema_text):
-    # Takes schema in the form "(Person, KNOWS, Person), (Person, WORKS_AT, Organization)" and returns parsed list of tuples.
-    schema_lst = [
-        tuple(item.split(","))
-        for item in schema_text.replace(" ", "").lstrip("(").rstrip(")").split("),(")
+# Let callers such as test harnesses reset the cache of previously fixed queries.
+fix_cypher_relationship_directions.cache_clear = _fix_cached.cache_clear
+
+
+def fix_cypher_queries(queries, schema_text, pattern_config=PATTERN_CONFIG):
+    """
+    Corrects relationship directions in a batch of Cypher queries that share one schema.
+
+    The schema is parsed once and schema decisions for identical relationships are reused across the whole batch.
+
+    Args:
+        queries (list[str]): The texts of valid Cypher queries
+        schema_text (str): Text containing triples that define possible relationships in database schema
+        pattern_config (dict): Dictionary that defines regex patterns for the parts of a cypher relationship
+
+    Returns:
+        list[str]: The corrected text of each query, or an empty string for queries that do not fit the schema.
+
+    Examples:
+        >>> queries = ["MATCH (o:Organization)-[:WORKS_AT]->(p:Person) RETURN p", "MATCH (p:Person)-[:KNOWS]->(c:City) RETURN c"]
+        >>> schema_text = "(Person, KNOWS, Person), (Person, WORKS_AT, Organization)"
+        >>> fix_cypher_queries(queries, schema_text)
+        ['MATCH (o:Organization)<-[:WORKS_AT]-(p:Person) RETURN p', '']
+    """
+    schema = process_schema(schema_text)
+    decision_cache = {}
+    return [
+        fix_directions_with_schema(cypher_text, schema, pattern_config, decision_cache)
+        for cypher_text in queries
     ]
-    return schema_lst
 
 
-def detect_relationships(cypher_text, schema_lst, pattern_config):
-    # Establish regex patterns for relationship and identify matching relationships.
-    relationship_pattern_text = (
-        r"(?=(?P<whole_relationship>"
-        + pattern_config["node1_pattern"]
-        + pattern_config["arrow_pattern"]
-        + pattern_config["node2_pattern"]
-        + r"))"
+def fix_directions_with_schema(cypher_text, schema, pattern_config, decision_cache):
+    # Use regular expressions (re library) to detect relationship patterns and return as list of Rel objects.
+    relationships = detect_relationships(cypher_text, pattern_config)
+
+    edits = []
+    for rel in relationships:
+        # Check if relationship exists within the defined schema, reusing the decision for identical relationships.
+        key = (
+            rel.tup,
+            rel.dir_code,
+            rel.is_variable_length,
+            rel.node_labels_same,
+            rel.is_negated_label,
+        )
+        if key in decision_cache:
+            rel.is_correct, rel.schema_match = decision_cache[key]
+        else:
+            find_relationship_in_schema(rel, schema)
+            decision_cache[key] = (rel.is_correct, rel.schema_match)
+
+        # Check for schema mismatches and return empty string if present.
+        if rel.schema_match is False:
+            return ""
+
+        # Collect corrections for incorrect directions as (start, end, replacement) spans.
+        if rel.is_correct is False:
+            edits.append(switch_direction(rel))
+
+    return apply_edits(cypher_text, edits)
+
+
+# Parsed schema triples along with column-wise projections used for membership tests.
+Schema = namedtuple(
+    "Schema",
+    [
+        "triple_set",
+        "reversed_triple_set",
+        "sources",
+        "rels",
+        "targets",
+        "src_rel",
+        "tgt_rel",
+        "rel_tgt",
+        "rel_src",
+        "src_tgt",
+        "tgt_src",
+        "pair_rels",
+        "source_rels",
+        "target_rels",
+    ],
+)
+
+
+@dataclass(slots=True)
+class Rel:
+    # A relationship detected in the Cypher query along with the characteristics used to decide its direction.
+    object: re.Match
+    node1_var_name: str
+    node1_label: str
+    node2_var_name: str
+    node2_label: str
+    rel_labels_raw: str
+    rel_labels: str
+    multi_labels: list
+    rel_hops: str
+    dir_code: int
+    tup: tuple = ()
+    node_labels_same: bool = False
+    is_variable_length: bool = False
+    is_multi_label: bool = False
+    is_negated_label: bool = False
+    negated_rel: str | None = None
+    is_correct: bool | None = None
+    schema_match: bool | None = None
+
+
+def process_schema(schema_text):
+    # Takes schema in the form "(Person, KNOWS, Person), (Person, WORKS_AT, Organization)" and returns parsed Schema.
+    # Entries that are not complete triples (e.g. from an empty schema) are skipped.
+    triples = tuple(
+        triple
+        for triple in (
+            tuple(item.split(","))
+            for item in schema_text.replace(" ", "").lstrip("(").rstrip(")").split("),(")
+        )
+        if len(triple) == 3
     )
-    relationship_pattern = re.compile(relationship_pattern_text, re.VERBOSE)
 
-    relationships = [
-        {"object": r} for r in re.finditer(relationship_pattern, cypher_text)
-    ]
+    # Project each column once so partial matches can be tested against sets instead of rebuilt lists.
+    sources = tuple(item[0] for item in triples)
+    rels = tuple(item[1] for item in triples)
+    targets = tuple(item[2] for item in triples)
+
+    # Map node label pairs and single node labels to the relationship labels they can appear with.
+    pair_rels = {}
+    source_rels = {}
+    target_rels = {}
+    for source, rel, target in triples:
+        pair_rels.setdefault((source, target), set()).add(rel)
+        source_rels.setdefault(source, set()).add(rel)
+        target_rels.setdefault(target, set()).add(rel)
+
+    return Schema(
+        triple_set=frozenset(triples),
+        reversed_triple_set=frozenset(item[::-1] for item in triples),
+        sources=frozenset(sources),
+        rels=frozenset(rels),
+        targets=frozenset(targets),
+        src_rel=frozenset(zip(sources, rels)),
+        tgt_rel=frozenset(zip(targets, rels)),
+        rel_tgt=frozenset(zip(rels, targets)),
+        rel_src=frozenset(zip(rels, sources)),
+        src_tgt=frozenset(zip(sources, targets)),
+        tgt_src=frozenset(zip(targets, sources)),
+        pair_rels={key: frozenset(value) for key, value in pair_rels.items()},
+        source_rels={key: frozenset(value) for key, value in source_rels.items()},
+        target_rels={key: frozenset(value) for key, value in target_rels.items()},
+    )
+
+
+def detect_relationships(cypher_text, pattern_config):
+    # Look up compiled regex patterns for nodes and for an arrow followed by its right-hand node.
+    node_pattern, arrow_node_pattern = get_compiled_patterns(pattern_config)
 
+    # Find every node once, then try to match an arrow and a right-hand node anchored at the end of each node.
+    # The right-hand node of one relationship is also found by the node scan, so chains like (a)-->(b)-->(c) yield
+    # overlapping relationships.  Matching the arrow from the left-hand node (rather than between adjacent node
+    # matches) keeps parentheses inside relationship properties, e.g. {since: date()}, from splitting the arrow.
+    nodes = list(node_pattern.finditer(cypher_text))
+    relationships = []
+    for node1 in nodes:
+        rel_match = arrow_node_pattern.match(cypher_text, node1.end())
+        if rel_match:
+            # Normalize the captured groups of each match once so later steps only read cleaned strings.
+            relationships.append(_clean(node1, rel_match))
+
+    node_label_map = None
     for rel in relationships:
+        # Detect FIRST node label for all nodes present in the Cypher query, but only once a relationship needs it.
+        if node_label_map is None and not (rel.node1_label and rel.node2_label):
+            node_label_map = {
+                node.group("node1_var_name"): _first_label(node.group("node1_labels"))
+                for node in nodes
+                if node.group("node1_labels")
+            }
+
         # Propogate node labels from prior variable definitions if available
-        detect_node_labels(rel, cypher_text, pattern_config)
+        detect_node_labels(rel, node_label_map)
 
         # Define the characteristics of the relationship that we can use to apply rules for deciding whether and how to change relationship directions.
         detect_relationship_characteristics(rel)
 
-        # Convert any relationship with a negated label into its positive, multi_label form
-        if rel["is_negated_label"]:
-            transform_negated_to_multi_label(rel, schema_lst)
+        # Record the negated label so schema lookups can test against every other relationship label at once.
+        if rel.is_negated_label:
+            detect_negated_label(rel)
 
     return relationships
 
 
-def detect_node_labels(relationship, cypher_text, pattern_config):
-    # Define variable names for nodes set labels to FIRST available label if defined.
-    relationship["node1"] = {
-        "var_name": relationship["object"].group("node1_var_name"),
-        "label1": next(
-            iter(
-                relationship["object"]
-                .group("node1_labels")
-                .lstrip(":")
-                .replace("`", "")
-                .split(":")
-                or [""]
-            )
-        ),
-    }
-    relationship["node2"] = {
-        "var_name": relationship["object"].group("node2_var_name"),
-        "label1": next(
-            iter(
-                relationship["object"]
-                .group("node2_labels")
-                .lstrip(":")
-                .replace("`", "")
-                .split(":")
-                or [""]
-            )
-        ),
-    }
-
-    # Detect FIRST node label for all nodes present in the Cypher query.
-    node_label_map = {
-        node.group("node1_var_name"): next(
-            iter(
-                node.group("node1_labels").lstrip(":").replace("`", "").split(":")
-                or [""]
-            )
-        )
-        for node in re.finditer(
-            re.compile(pattern_config["node1_pattern"], re.VERBOSE), cypher_text
-        )
-        if node.group("node1_labels")
-    }
+def _clean(node1_match, rel_match):
+    # Read every regex group used downstream once and strip colons and backticks from the labels.
+    rel_labels_raw = rel_match.group("rel_labels")
+    return Rel(
+        object=rel_match,
+        node1_var_name=node1_match.group("node1_var_name"),
+        node1_label=_first_label(node1_match.group("node1_labels")),
+        node2_var_name=rel_match.group("node2_var_name"),
+        node2_label=_first_label(rel_match.group("node2_labels")),
+        rel_labels_raw=rel_labels_raw,
+        rel_labels=rel_labels_raw.lstrip(":").replace("`", ""),
+        multi_labels=[
+            label.translate(_LABEL_STRIP) for label in rel_labels_raw.split("|")
+        ],
+        rel_hops=rel_match.group("rel_hops"),
+        # Relationship direction is -1 for '<', 1 for '>', and 0 when undirected.
+        dir_code=-1
+        if rel_match.group("rel_left_arrow")
+        else (1 if rel_match.group("rel_right_arrow") else 0),
+    )
+
+
+def detect_node_labels(relationship, node_label_map):
+    # Both labels were given inline, so there is nothing to propagate.
+    if relationship.node1_label and relationship.node2_label:
+        return
 
     # Propogate node labels from the original variable definition to nodes in the relationship definition.
-    if relationship["node1"]["label1"] == "":
-        relationship["node1"]["label1"] = node_label_map.get(
-            relationship["node1"]["var_name"], ""
-        )
-    if relationship["node2"]["label1"] == "":
-        relationship["node2"]["label1"] = node_label_map.get(
-            relationship["node2"]["var_name"], ""
-        )
+    if relationship.node1_label == "":
+        relationship.node1_label = node_label_map.get(relationship.node1_var_name, "")
+    if relationship.node2_label == "":
+        relationship.node2_label = node_label_map.get(relationship.node2_var_name, "")
+
+
+def _first_label(labels):
+    # Extract the FIRST label from a raw label group such as ":`Person`:Actor".
+    return labels.lstrip(":").replace("`", "").partition(":")[0]
 
 
 def detect_relationship_characteristics(relationship):
+    rel_labels_raw = relationship.rel_labels_raw
+
     # Tuple containing labels for nodes and relationships.  Nodes have FIRST label only.  Relationships have all labels with original separator.
-    relationship["tup"] = (
-        relationship["node1"]["label1"].strip("`"),
-        relationship["object"].group("rel_labels").lstrip(":").replace("`", ""),
-        relationship["node2"]["label1"].strip("`"),
+    relationship.tup = (
+        relationship.node1_label,
+        relationship.rel_labels,
+        relationship.node2_label,
     )
 
-    # Relationship direction should be '<', '>', or None.
-    relationship["direction"] = relationship["object"].group(
-        "rel_left_arrow"
-    ) or relationship["object"].group("rel_right_arrow")
-
     # Tests if node labels are equivalent.
-    relationship["node_labels_same"] = (
-        relationship["node1"]["label1"] == relationship["node2"]["label1"]
-    )
+    relationship.node_labels_same = relationship.node1_label == relationship.node2_label
 
     # Tests if relationship could have variable length such as '*' or '*1..4' characters following relationship label.
-    relationship["is_variable_length"] = (
-        relationship["object"].group("rel_hops") == "*"
-    ) or (
-        "*" in relationship["object"].group("rel_hops")
-        and ".." in relationship["object"].group("rel_hops")
-    )
+    relationship.is_variable_length = _is_variable_length(relationship.rel_hops)
 
     # Tests for presence of pipe character which implies that the relationship has multiple labels.
-    relationship["is_multi_label"] = "|" in str(
-        relationship["object"].group("rel_labels")
-    )
-
-    # Extracts a list of all relationship labels detected.
-    relationship["multi_labels"] = [
-        re.sub(r"[\s`:]*", r"", label)
-        for label in relationship["object"].group("rel_labels").split("|")
-    ]
+    relationship.is_multi_label = "|" in rel_labels_raw
 
     # Tests for presence of '!' which implies that the relationship type is negated.
-    relationship["is_negated_label"] = (
-        relationship["object"].group("rel_labels").lstrip(":").startswith("!")
-    )
-
+    relationship.is_negated_label = _is_negated(rel_labels_raw)
 
-def transform_negated_to_multi_label(relationship, schema_lst):
-    # Treat negated label as multi-labeled relationship so that we can detect if ANY implied relationship label fits the schema.
-    negated_label = relationship["tup"][1].lstrip("!")
-    relationship["multi_labels"] = [
-        item[1] for item in schema_lst if item[1] != negated_label
-    ]
-    relationship["is_multi_label"] = True
 
+def _is_variable_length(rel_hops):
+    # The hops pattern only allows '*' as the first character, so a prefix test replaces the substring scan.
+    return rel_hops == "*" or (rel_hops.startswith("*") and ".." in rel_hops)
 
-def find_relationship_in_schema(relationship, schema_lst):
-    for label in relationship["multi_labels"]:
-        # Overwrite the relationship tuple definition to be for single label case so we can try to find one relationship at a time.
-        relationship["tup"] = (
-            relationship["node1"]["label1"],
-            label,
-            relationship["node2"]["label1"],
-        )
-        find_single_label_relationship_in_schema(relationship, schema_lst)
 
-        # If any correct relationship direction is found, stop looking because we will not correct relationship direction.
-        if relationship.get("is_correct", False) == True:
-            break
+def _is_negated(rel_labels_raw):
+    # Most labels contain no '!', so check for it before building the colon-stripped copy.
+    return "!" in rel_labels_raw and rel_labels_raw.lstrip(":").startswith("!")
 
 
-def find_single_label_relationship_in_schema(relationship, schema_lst):
-    # Don't do anything further if relationship is undirected, between two nodes of same label, or is of variable length.
-    if is_unfixable(relationship):
-        relationship["is_correct"] = True
-        relationship["schema_match"] = True
+def detect_negated_label(relationship):
+    # Store the label that follows '!' so that ANY other relationship label in the schema can be treated as a match.
+    relationship.negated_rel = relationship.tup[1].lstrip("!")
 
-    # If all relationship labels and types exist, try to find it in schema.
-    elif is_complete(relationship):
-        find_complete_tup_in_schema(relationship, schema_lst)
 
-    # If not all relationship labels and types exist, delegate to partial match function.
-    else:
-        find_partial_tup_in_schema(relationship, schema_lst)
-
-
-def find_complete_tup_in_schema(relationship, schema_lst):
-    # If the current direction of the relationship is correct, mark it as such.
-    if make_left_to_right(relationship) in schema_lst:
-        relationship["is_correct"] = True
-        relationship["schema_match"] = True
-    # If the reverse direction of the relationship is found in schema, mark it as incorrect.
-    elif make_left_to_right(relationship)[::-1] in schema_lst:
-        relationship["is_correct"] = False
-        relationship["schema_match"] = True
-    # If the relationship is not found at all, mark 'schema_match' as False so we can know to return an empty string.
-    else:
-        relationship["schema_match"] = False
-
-
-def find_partial_tup_in_schema(relationship, schema_lst):
-    left_to_right_relationship = make_left_to_right(relationship)
-    pieces_existing = tuple(bool(item) for item in left_to_right_relationship)
-
-    # With one node label and one relationship label, the schema can still be checked for any correct relationship.
-    if pieces_existing == (True, True, False):
-        if left_to_right_relationship[:2] in zip(
-            [item[0] for item in schema_lst], [item[1] for item in schema_lst]
-        ):
-            relationship["is_correct"] = True
-            relationship["schema_match"] = True
-        elif left_to_right_relationship[:2] in zip(
-            [item[2] for item in schema_lst], [item[1] for item in schema_lst]
-        ):
-            relationship["is_correct"] = False
-            relationship["schema_match"] = True
-        else:
-            relationship["schema_match"] = False
-
-    # With one node label and one relationship label, the schema can still be checked for any correct relationship.
-    elif pieces_existing == (False, True, True):
-        if left_to_right_relationship[1:] in zip(
-            [item[1] for item in schema_lst], [item[2] for item in schema_lst]
-        ):
-            relationship["is_correct"] = True
-            relationship["schema_match"] = True
-        elif left_to_right_relationship[1:] in zip(
-            [item[1] for item in schema_lst], [item[0] for item in schema_lst]
-        ):
-            relationship["is_correct"] = False
-            relationship["schema_match"] = True
-        else:
-            relationship["schema_match"] = False
-
-    # With two node labels, the schema can still be checked for any potentially matching relationship.
-    elif pieces_existing == (True, False, True):
-        if tuple([left_to_right_relationship[0], left_to_right_relationship[2]]) in zip(
-            [item[0] for item in schema_lst], [item[2] for item in schema_lst]
-        ):
-            relationship["is_correct"] = True
-            relationship["schema_match"] = True
-        elif tuple(
-            [left_to_right_relationship[0], left_to_right_relationship[2]]
-        ) in zip([item[2] for item in schema_lst], [item[0] for item in schema_lst]):
-            relationship["is_correct"] = False
-            relationship["schema_match"] = True
-        else:
-            relationship["schema_match"] = False
-
-    # With one node label, the schema can still be checked for any potentially matching relationship.
-    elif pieces_existing == (True, False, False):
-        if left_to_right_relationship[0] in [item[0] for item in schema_lst]:
-            relationship["is_correct"] = True
-            relationship["schema_match"] = True
-        elif left_to_right_relationship[0] in [item[2] for item in schema_lst]:
-            relationship["is_correct"] = False
-            relationship["schema_match"] = True
-        else:
-            relationship["schema_match"] = False
-
-    # With one node label, the schema can still be checked for any potentially matching relationship.
-    elif pieces_existing == (False, False, True):
-        if left_to_right_relationship[2] in [item[2] for item in schema_lst]:
-            relationship["is_correct"] = True
-            relationship["schema_match"] = True
-        elif left_to_right_relationship[2] in [item[0] for item in schema_lst]:
-            relationship["is_correct"] = False
-            relationship["schema_match"] = True
-        else:
-            relationship["schema_match"] = False
+def find_relationship_in_schema(relationship, schema):
+    if relationship.is_negated_label:
+        find_negated_relationship_in_schema(relationship, schema)
+        return
 
-    # With only a relationship label, the schema can be checked for any matching relationship label.
-    elif pieces_existing == (False, True, False):
-        if left_to_right_relationship[1] in [item[1] for item in schema_lst]:
-            relationship["is_correct"] = True
-            relationship["schema_match"] = True
-        else:
-            relationship["schema_match"] = False
+    schema_match = False
+    for label in relationship.multi_labels:
+        # Overwrite the relationship tuple definition to be for single label case so we can try to find one relationship at a time.
+        relationship.tup = (relationship.node1_label, label, relationship.node2_label)
+        find_single_label_relationship_in_schema(relationship, schema)
 
-    # With no labels, the relationship direction is assumed to be correct.
-    else:
-        relationship["is_correct"] = True
-        relationship["schema_match"] = True
+        # If any correct relationship direction is found, stop looking because we will not correct relationship direction.
+        if relationship.is_correct is True:
+            break
 
+        # Don't let a later label without a schema match mask an earlier label that matched in reverse.
+        schema_match = schema_match or relationship.schema_match
+        relationship.schema_match = schema_match
 
-def make_left_to_right(relationship):
-    # Change tup of node and relationship labels to read left to right according to the actual direction of the relationship.
-    if relationship["direction"] == "<":
-        return relationship["tup"][::-1]
-    else:
-        return relationship["tup"]
-
-
-def is_unfixable(relationship):
-    # All relationships that are undirected, variable length or between nodes with the same label do not need direction changes.
-    if any(
-        [
-            not relationship["direction"],
-            relationship["node1"]["label1"] == relationship["node2"]["label1"],
-            relationship["is_variable_length"],
-        ]
-    ):
-        return True
-    else:
-        return False
 
+def find_negated_relationship_in_schema(relationship, schema):
+    # With no other relationship label in the schema there is nothing to check, so leave the relationship as written.
+    negated_rel = {relationship.negated_rel}
+    if not schema.rels - negated_rel:
+        return
 
-def is_complete(relationship):
-    # Test if nodes and relationship all have labels.
-    if any(i == "" for i in relationship["tup"]):
-        return False
+    # Don't do anything further if relationship is undirected, between two nodes of same label, or is of variable length.
+    if is_unfixable(relationship):
+        relationship.is_correct = True
+        relationship.schema_match = True
+        return
+
+    # Collect the relationship labels that fit the node labels in the current and the reverse direction.
+    source, _, target = make_left_to_right(relationship)
+    if source and target:
+        forward_rels = schema.pair_rels.get((source, target), frozenset())
+        reverse_rels = schema.pair_rels.get((target, source), frozenset())
+    elif source:
+        forward_rels = schema.source_rels.get(source, frozenset())
+        reverse_rels = schema.target_rels.get(source, frozenset())
+    elif target:
+        forward_rels = schema.target_rels.get(target, frozenset())
+        reverse_rels = schema.source_rels.get(target, frozenset())
     else:
-        return True
-
+        forward_rels = schema.rels
+        reverse_rels = frozenset()
+
+    # Any label other than the negated one is enough to decide the direction.
+    if forward_rels - negated_rel:
+        relationship.is_correct = True
+        relationship.schema_match = True
+    elif reverse_rels - negated_rel:
+        relationship.is_correct = False
+        relationship.schema_match = True
+    else:
+        relationship.schema_match = False
 
-def switch_direction(cypher_text, relationship):
-    # Switch the direction of the given relationship within the text of the cypher query.
-    old_relationship = relationship["object"].group("whole_relationship")
 
-    if relationship["direction"] == ">":
-        new_relationship = old_relationship.replace("->", "-").replace(")-", ")<-")
+def switch_direction(relationship):
+    # Switch the direction of the given relationship and return the span of the arrow with its replacement text.
+    # The arrowhead positions are known from the match, so the arrow is rebuilt from slices around them.
+    match = relationship.object
+    start = match.start("rel")
+    old_arrow = match.group("rel")
 
-    elif relationship["direction"] == "<":
-        new_relationship = old_relationship.replace("<-", "-").replace("-(", "->(")
+    if relationship.dir_code > 0:
+        # Drop the right arrowhead and add a left arrowhead before the first hyphen.
+        arrow_pos = match.start("rel_right_arrow") - start
+        new_arrow = "<" + old_arrow[:arrow_pos] + old_arrow[arrow_pos + 1 :]
 
-    return cypher_text.replace(old_relationship, new_relationship)
+    else:
+        # Drop the left arrowhead and add a right arrowhead after the last hyphen unless a bidirectional arrow already has one.
+        arrow_pos = match.end("rel_left_arrow") - start
+        new_arrow = old_arrow[arrow_pos:]
+        if not match.group("rel_right_arrow"):
+            new_arrow += ">"
+
+    return start, match.end("rel"), new_arrow
+
+
+def apply_edits(cypher_text, edits):
+    # Rebuild the cypher query in a single pass, splicing each replacement into its span.
+    parts = []
+    prev = 0
+    for start, end, new_text in sorted(edits):
+        parts.append(cypher_text[prev:start])
+        parts.append(new_text)
+        prev = end
+    parts.append(cypher_text[prev:])
+    return "".join(parts)
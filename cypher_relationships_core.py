@@ -0,0 +1,129 @@
+# Schema lookup hot path for cypher_relationships.
+#
+# This module is plain Python so it always imports, but it is kept free of dependencies on the regex
+# handling in cypher_relationships so that Cython can compile it as-is into an extension module.
+
+
+def find_single_label_relationship_in_schema(relationship, schema):
+    # Don't do anything further if relationship is undirected, between two nodes of same label, or is of variable length.
+    if is_unfixable(relationship):
+        relationship.is_correct = True
+        relationship.schema_match = True
+
+    # If all relationship labels and types exist, try to find it in schema.
+    elif is_complete(relationship):
+        find_complete_tup_in_schema(relationship, schema)
+
+    # If not all relationship labels and types exist, delegate to partial match function.
+    else:
+        find_partial_tup_in_schema(relationship, schema)
+
+
+def find_complete_tup_in_schema(relationship, schema):
+    left_to_right_relationship = make_left_to_right(relationship)
+
+    # If the current direction of the relationship is correct, mark it as such.
+    if left_to_right_relationship in schema.triple_set:
+        relationship.is_correct = True
+        relationship.schema_match = True
+    # If the reverse direction of the relationship is found in schema, mark it as incorrect.
+    elif left_to_right_relationship in schema.reversed_triple_set:
+        relationship.is_correct = False
+        relationship.schema_match = True
+    # If the relationship is not found at all, mark 'schema_match' as False so we can know to return an empty string.
+    else:
+        relationship.schema_match = False
+
+
+def find_partial_tup_in_schema(relationship, schema):
+    left_to_right_relationship = make_left_to_right(relationship)
+    pieces_existing = tuple(bool(item) for item in left_to_right_relationship)
+    source, rel, target = left_to_right_relationship
+
+    # With one node label and one relationship label, the schema can still be checked for any correct relationship.
+    if pieces_existing == (True, True, False):
+        if (source, rel) in schema.src_rel:
+            relationship.is_correct = True
+            relationship.schema_match = True
+        elif (source, rel) in schema.tgt_rel:
+            relationship.is_correct = False
+            relationship.schema_match = True
+        else:
+            relationship.schema_match = False
+
+    # With one node label and one relationship label, the schema can still be checked for any correct relationship.
+    elif pieces_existing == (False, True, True):
+        if (rel, target) in schema.rel_tgt:
+            relationship.is_correct = True
+            relationship.schema_match = True
+        elif (rel, target) in schema.rel_src:
+            relationship.is_correct = False
+            relationship.schema_match = True
+        else:
+            relationship.schema_match = False
+
+    # With two node labels, the schema can still be checked for any potentially matching relationship.
+    elif pieces_existing == (True, False, True):
+        if (source, target) in schema.src_tgt:
+            relationship.is_correct = True
+            relationship.schema_match = True
+        elif (source, target) in schema.tgt_src:
+            relationship.is_correct = False
+            relationship.schema_match = True
+        else:
+            relationship.schema_match = False
+
+    # With one node label, the schema can still be checked for any potentially matching relationship.
+    elif pieces_existing == (True, False, False):
+        if source in schema.sources:
+            relationship.is_correct = True
+            relationship.schema_match = True
+        elif source in schema.targets:
+            relationship.is_correct = False
+            relationship.schema_match = True
+        else:
+            relationship.schema_match = False
+
+    # With one node label, the schema can still be checked for any potentially matching relationship.
+    elif pieces_existing == (False, False, True):
+        if target in schema.targets:
+            relationship.is_correct = True
+            relationship.schema_match = True
+        elif target in schema.sources:
+            relationship.is_correct = False
+            relationship.schema_match = True
+        else:
+            relationship.schema_match = False
+
+    # With only a relationship label, the schema can be checked for any matching relationship label.
+    elif pieces_existing == (False, True, False):
+        if rel in schema.rels:
+            relationship.is_correct = True
+            relationship.schema_match = True
+        else:
+            relationship.schema_match = False
+
+    # With no labels, the relationship direction is assumed to be correct.
+    else:
+        relationship.is_correct = True
+        relationship.schema_match = True
+
+
+def make_left_to_right(relationship):
+    # Change tup of node and relationship labels to read left to right according to the actual direction of the relationship.
+    return relationship.tup if relationship.dir_code >= 0 else relationship.tup[::-1]
+
+
+def is_unfixable(relationship):
+    # All relationships that are undirected, variable length or between nodes with the same label do not need direction changes.
+    return (
+        not relationship.dir_code
+        or relationship.node1_label == relationship.node2_label
+        or relationship.is_variable_length
+    )
+
+
+def is_complete(relationship):
+    # Test if nodes and relationship all have labels.
+    source, rel, target = relationship.tup
+    return bool(source) and bool(rel) and bool(target)
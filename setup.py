@@ -0,0 +1,18 @@
+from setuptools import setup
+
+# Compile the schema lookup module with Cython when it is available; otherwise install it as plain Python.
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize(
+        "cypher_relationships_core.py", compiler_directives={"language_level": 3}
+    )
+
+setup(
+    name="cypher_direction_validation_entry",
+    python_requires=">=3.10",
+    py_modules=["cypher_relationships", "cypher_relationships_core"],
+    ext_modules=ext_modules,
+)
@@ -0,0 +1,76 @@
+from cypher_relationships import fix_cypher_queries, fix_cypher_relationship_directions
+
+
+def test_parentheses_in_relationship_properties_do_not_hide_relationship():
+    schema_text = "(Person, WORKS_AT, Organization)"
+    assert (
+        fix_cypher_relationship_directions(
+            "MATCH (o:Organization)-[:WORKS_AT {since: date()}]->(p:Person) RETURN p",
+            schema_text,
+        )
+        == "MATCH (o:Organization)<-[:WORKS_AT {since: date()}]-(p:Person) RETURN p"
+    )
+    assert (
+        fix_cypher_relationship_directions(
+            "MATCH (o:Organization)-[r:WORKS_AT {since: toInteger(x)}]->(p:Person) RETURN p",
+            schema_text,
+        )
+        == "MATCH (o:Organization)<-[r:WORKS_AT {since: toInteger(x)}]-(p:Person) RETURN p"
+    )
+    assert (
+        fix_cypher_relationship_directions(
+            "MATCH (a:Person)-[:R {p: f(x)}]->(b:Organization) RETURN a", schema_text
+        )
+        == ""
+    )
+
+
+def test_negated_label_without_other_schema_labels_is_unchanged():
+    cypher_text = "MATCH (p:Person)-[:!WORKS_AT]->(o:Organization) RETURN p"
+    schema_text = "(Person, WORKS_AT, Organization)"
+    assert fix_cypher_relationship_directions(cypher_text, schema_text) == cypher_text
+
+
+def test_unmatched_label_does_not_mask_reverse_match():
+    schema_text = "(Person, LIVES_IN, City), (Person, KNOWS, Person), (Person, WORKS_AT, Organization)"
+    assert (
+        fix_cypher_relationship_directions(
+            "MATCH ()<-[r:!KNOWS]-(a:City) RETURN a", schema_text
+        )
+        == "MATCH ()-[r:!KNOWS]->(a:City) RETURN a"
+    )
+    assert (
+        fix_cypher_relationship_directions(
+            "MATCH (c:City)-[:LIVES_IN|WORKS_AT]->(p:Person) RETURN p", schema_text
+        )
+        == "MATCH (c:City)<-[:LIVES_IN|WORKS_AT]-(p:Person) RETURN p"
+    )
+
+
+def test_bidirectional_arrow_keeps_single_right_arrowhead():
+    schema_text = "(Person, WORKS_AT, Organization)"
+    assert (
+        fix_cypher_relationship_directions(
+            "MATCH (p:Person)<-[:WORKS_AT]->(o:Organization) RETURN o", schema_text
+        )
+        == "MATCH (p:Person)-[:WORKS_AT]->(o:Organization) RETURN o"
+    )
+    assert (
+        fix_cypher_relationship_directions(
+            "MATCH (p:Person)<-->(o:Organization) RETURN o", schema_text
+        )
+        == "MATCH (p:Person)-->(o:Organization) RETURN o"
+    )
+
+
+def test_empty_schema_leaves_queries_unchanged():
+    assert fix_cypher_relationship_directions("MATCH (n) RETURN n", "") == "MATCH (n) RETURN n"
+    assert fix_cypher_relationship_directions("MATCH (a)-->(b)", "") == "MATCH (a)-->(b)"
+    assert fix_cypher_queries(["MATCH (a)-->(b)"], "") == ["MATCH (a)-->(b)"]
+
+
+def test_incomplete_schema_entries_are_ignored():
+    schema = "(Person, WORKS_AT), (Person, WORKS_AT, Organization)"
+    query = "MATCH (o:Organization)-[:WORKS_AT]->(p:Person) RETURN o"
+    expected = "MATCH (o:Organization)<-[:WORKS_AT]-(p:Person) RETURN o"
+    assert fix_cypher_relationship_directions(query, schema) == expected